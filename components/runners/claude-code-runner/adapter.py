@@ -809,14 +809,7 @@ class ClaudeCodeAdapter:
         cwd_path = self.context.workspace_path
 
         try:
-            owner, repo, _ = self._parse_owner_repo(active_workflow_url)
-            derived_name = repo or ''
-            if not derived_name:
-                p = urlparse(active_workflow_url)
-                parts = [pt for pt in (p.path or '').split('/') if pt]
-                if parts:
-                    derived_name = parts[-1]
-            derived_name = (derived_name or '').removesuffix('.git').strip()
+            derived_name = self._derive_repo_name(active_workflow_url)
 
             if derived_name:
                 workflow_path = str(Path(self.context.workspace_path) / "workflows" / derived_name)
@@ -1017,14 +1010,7 @@ class ClaudeCodeAdapter:
             return
 
         try:
-            owner, repo, _ = self._parse_owner_repo(active_workflow_url)
-            derived_name = repo or ''
-            if not derived_name:
-                p = urlparse(active_workflow_url)
-                parts = [pt for pt in (p.path or '').split('/') if pt]
-                if parts:
-                    derived_name = parts[-1]
-            derived_name = (derived_name or '').removesuffix('.git').strip()
+            derived_name = self._derive_repo_name(active_workflow_url)
 
             if not derived_name:
                 logger.warning("Could not derive workflow name from URL")
@@ -1215,66 +1201,73 @@ class ClaudeCodeAdapter:
             return "", "", host
         return "", "", host
 
+    def _derive_repo_name(self, url: str) -> str:
+        """Return the directory name a repo URL is cloned into (`basename URL .git` in hydrate.sh).
+
+        Handles https://host/owner/repo(.git) and git@host:owner/repo(.git); query strings,
+        fragments and trailing slashes are ignored.
+        """
+        path = urlparse((url or '').strip()).path
+        return path.rstrip('/').removesuffix('.git').rpartition('/')[2].rpartition(':')[2].strip()
+
     def _get_repos_config(self) -> list[dict]:
         """Read repos mapping from REPOS_JSON env if present.
 
         Expected format: [{"url": "...", "branch": "main", "autoPush": true}, ...]
         Returns: [{"name": "repo-name", "url": "...", "branch": "...", "autoPush": bool}, ...]
         """
+        raw = os.getenv('REPOS_JSON', '').strip()
+        if not raw:
+            return []
         try:
-            raw = os.getenv('REPOS_JSON', '').strip()
-            if not raw:
-                return []
             data = _json.loads(raw)
-            if isinstance(data, list):
-                out = []
-                for it in data:
-                    if not isinstance(it, dict):
-                        continue
+        except (ValueError, RecursionError):
+            # Malformed or too deeply nested to parse
+            return []
+        return self._normalize_repos(data)
 
-                    # Extract simple format fields
-                    url = str(it.get('url') or '').strip()
-                    # Auto-generate branch from session name if not provided
-                    branch_from_json = it.get('branch')
-                    if branch_from_json and str(branch_from_json).strip():
-                        branch = str(branch_from_json).strip()
-                    else:
-                        # Fallback: use AGENTIC_SESSION_NAME to match backend logic
-                        session_id = os.getenv('AGENTIC_SESSION_NAME', '').strip()
-                        branch = f"ambient/{session_id}" if session_id else 'main'
-                    # Parse autoPush as boolean, defaulting to False for invalid types
-                    auto_push_raw = it.get('autoPush', False)
-                    auto_push = auto_push_raw if isinstance(auto_push_raw, bool) else False
-
-                    if not url:
-                        continue
+    def _normalize_repos(self, data: Any) -> list[dict]:
+        """Normalize already-parsed REPOS_JSON entries (see _get_repos_config).
 
-                    # Derive repo name from URL if not provided
-                    name = str(it.get('name') or '').strip()
-                    if not name:
-                        try:
-                            owner, repo, _ = self._parse_owner_repo(url)
-                            derived = repo or ''
-                            if not derived:
-                                p = urlparse(url)
-                                parts = [pt for pt in (p.path or '').split('/') if pt]
-                                if parts:
-                                    derived = parts[-1]
-                            name = (derived or '').removesuffix('.git').strip()
-                        except Exception:
-                            name = ''
-
-                    if name and url:
-                        out.append({
-                            'name': name,
-                            'url': url,
-                            'branch': branch,
-                            'autoPush': auto_push
-                        })
-                return out
-        except Exception:
+        Non-list input yields []; entries that are not dicts or lack a url are skipped.
+        """
+        if not isinstance(data, list):
             return []
-        return []
+        out = []
+        for it in data:
+            if not isinstance(it, dict):
+                continue
+
+            # Extract simple format fields
+            url = str(it.get('url') or '').strip()
+            # Auto-generate branch from session name if not provided
+            branch_from_json = it.get('branch')
+            if branch_from_json and str(branch_from_json).strip():
+                branch = str(branch_from_json).strip()
+            else:
+                # Fallback: use AGENTIC_SESSION_NAME to match backend logic
+                session_id = os.getenv('AGENTIC_SESSION_NAME', '').strip()
+                branch = f"ambient/{session_id}" if session_id else 'main'
+            # Parse autoPush as boolean, defaulting to False for invalid types
+            auto_push_raw = it.get('autoPush', False)
+            auto_push = auto_push_raw if isinstance(auto_push_raw, bool) else False
+
+            if not url:
+                continue
+
+            # Derive repo name from URL if not provided
+            name = str(it.get('name') or '').strip()
+            if not name:
+                name = self._derive_repo_name(url)
+
+            if name and url:
+                out.append({
+                    'name': name,
+                    'url': url,
+                    'branch': branch,
+                    'autoPush': auto_push
+                })
+        return out
 
     def _load_mcp_config(self, cwd_path: str) -> Optional[dict]:
         """Load MCP server configuration from the ambient runner's .mcp.json file."""
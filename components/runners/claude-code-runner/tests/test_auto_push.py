@@ -2,368 +2,224 @@
 
 import pytest
 import json
-import os
-import sys
-from unittest.mock import MagicMock, patch, Mock
-
-# Mock ag_ui module before importing adapter
-sys.modules['ag_ui'] = Mock()
-sys.modules['ag_ui.core'] = Mock()
-sys.modules['context'] = Mock()
-
-
-class TestGetReposConfig:
-    """Tests for _get_repos_config method."""
-
-    def setup_method(self):
-        """Set up test fixtures."""
-        # Import here after mocking dependencies
-        from adapter import ClaudeCodeAdapter
-        self.adapter = ClaudeCodeAdapter()
-
-    def test_parse_simple_repo_with_autopush_true(self):
-        """Test parsing repo with autoPush=true."""
-        repos_json = json.dumps([
-            {
-                "url": "https://github.com/owner/repo.git",
-                "branch": "main",
-                "autoPush": True
-            }
-        ])
-
-        with patch.dict(os.environ, {"REPOS_JSON": repos_json}):
-            result = self.adapter._get_repos_config()
-
-        assert len(result) == 1
-        assert result[0]["url"] == "https://github.com/owner/repo.git"
-        assert result[0]["branch"] == "main"
-        assert result[0]["autoPush"] is True
-        assert "repo" in result[0]["name"]
-
-    def test_parse_simple_repo_with_autopush_false(self):
-        """Test parsing repo with autoPush=false."""
-        repos_json = json.dumps([
-            {
-                "url": "https://github.com/owner/repo.git",
-                "branch": "develop",
-                "autoPush": False
-            }
-        ])
-
-        with patch.dict(os.environ, {"REPOS_JSON": repos_json}):
-            result = self.adapter._get_repos_config()
-
-        assert len(result) == 1
-        assert result[0]["autoPush"] is False
-
-    def test_parse_repo_without_autopush(self):
-        """Test parsing repo without autoPush field defaults to False."""
-        repos_json = json.dumps([
-            {
-                "url": "https://github.com/owner/repo.git",
-                "branch": "main"
-            }
-        ])
-
-        with patch.dict(os.environ, {"REPOS_JSON": repos_json}):
-            result = self.adapter._get_repos_config()
-
-        assert len(result) == 1
-        assert result[0]["autoPush"] is False
-
-    def test_parse_multiple_repos_mixed_autopush(self):
-        """Test parsing multiple repos with mixed autoPush settings."""
-        repos_json = json.dumps([
-            {
-                "url": "https://github.com/owner/repo1.git",
-                "branch": "main",
-                "autoPush": True
-            },
-            {
-                "url": "https://github.com/owner/repo2.git",
-                "branch": "develop",
-                "autoPush": False
-            },
-            {
-                "url": "https://github.com/owner/repo3.git",
-                "branch": "feature"
-                # No autoPush field
-            }
-        ])
-
-        with patch.dict(os.environ, {"REPOS_JSON": repos_json}):
-            result = self.adapter._get_repos_config()
-
-        assert len(result) == 3
-        assert result[0]["autoPush"] is True
-        assert result[1]["autoPush"] is False
-        assert result[2]["autoPush"] is False  # Default
-
-    def test_parse_repo_with_explicit_name(self):
-        """Test parsing repo with explicit name field."""
-        repos_json = json.dumps([
+from types import SimpleNamespace
+
+# ag_ui is stubbed in conftest.py when ag-ui-protocol is not installed
+from adapter import ClaudeCodeAdapter
+
+
+@pytest.fixture(scope="module")
+def adapter():
+    """Shared adapter instance for all tests in this module."""
+    return ClaudeCodeAdapter()
+
+
+# (parsed REPOS_JSON entries, expected fields per normalized repo)
+REPO_CASES = [
+    pytest.param(
+        [
+            {"url": "https://github.com/owner/repo.git", "branch": "main", "autoPush": True},
+        ],
+        [{"name": "repo", "url": "https://github.com/owner/repo.git", "branch": "main", "autoPush": True}],
+        id="autopush-true",
+    ),
+    pytest.param(
+        [
+            {"url": "https://github.com/owner/repo.git", "branch": "develop", "autoPush": False},
+        ],
+        [{"branch": "develop", "autoPush": False}],
+        id="autopush-false",
+    ),
+    pytest.param(
+        [
+            {"url": "https://github.com/owner/repo.git", "branch": "main"},
+        ],
+        [{"autoPush": False}],
+        id="autopush-missing-defaults-false",
+    ),
+    pytest.param(
+        [
+            {"url": "https://github.com/owner/repo1.git", "branch": "main", "autoPush": True},
+            {"url": "https://github.com/owner/repo2.git", "branch": "develop", "autoPush": False},
+            {"url": "https://github.com/owner/repo3.git", "branch": "feature"},  # No autoPush field
+        ],
+        [{"autoPush": True}, {"autoPush": False}, {"autoPush": False}],
+        id="multiple-repos-mixed-autopush",
+    ),
+    pytest.param(
+        [
             {
                 "name": "my-custom-repo",
                 "url": "https://github.com/owner/repo.git",
                 "branch": "main",
-                "autoPush": True
-            }
-        ])
-
-        with patch.dict(os.environ, {"REPOS_JSON": repos_json}):
-            result = self.adapter._get_repos_config()
-
-        assert len(result) == 1
-        assert result[0]["name"] == "my-custom-repo"
-        assert result[0]["autoPush"] is True
-
-    def test_parse_empty_repos_json(self):
-        """Test parsing empty REPOS_JSON."""
-        with patch.dict(os.environ, {"REPOS_JSON": ""}):
-            result = self.adapter._get_repos_config()
-
-        assert result == []
-
-    def test_parse_missing_repos_json(self):
-        """Test parsing when REPOS_JSON not set."""
-        with patch.dict(os.environ, {}, clear=True):
-            result = self.adapter._get_repos_config()
-
-        assert result == []
-
-    def test_parse_invalid_json(self):
-        """Test parsing invalid JSON returns empty list."""
-        with patch.dict(os.environ, {"REPOS_JSON": "invalid-json{"}):
-            result = self.adapter._get_repos_config()
-
-        assert result == []
-
-    def test_parse_non_list_json(self):
-        """Test parsing non-list JSON returns empty list."""
-        repos_json = json.dumps({"url": "https://github.com/owner/repo.git"})
-
-        with patch.dict(os.environ, {"REPOS_JSON": repos_json}):
-            result = self.adapter._get_repos_config()
+                "autoPush": True,
+            },
+        ],
+        [{"name": "my-custom-repo", "autoPush": True}],
+        id="explicit-name",
+    ),
+    pytest.param(
+        [{"url": "https://github.com/owner/my-repo.git", "autoPush": True}],
+        [{"name": "my-repo"}],
+        id="derive-name-https-dot-git",
+    ),
+    pytest.param(
+        [{"url": "https://github.com/owner/my-repo", "autoPush": True}],
+        [{"name": "my-repo"}],
+        id="derive-name-https",
+    ),
+    pytest.param(
+        [{"url": "git@github.com:owner/another-repo.git", "autoPush": True}],
+        [{"name": "another-repo"}],
+        id="derive-name-ssh",
+    ),
+    pytest.param(
+        [{"url": "https://github.com/owner/my-repo/", "autoPush": True}],
+        [{"name": "my-repo"}],
+        id="derive-name-trailing-slash",
+    ),
+    pytest.param(
+        [{"url": "https://github.com/owner/my-repo.git/", "autoPush": True}],
+        [{"name": "my-repo"}],
+        id="derive-name-dot-git-trailing-slash",
+    ),
+    pytest.param(
+        [{"url": "https://github.com/owner/my-repo.git?ref=main#readme", "autoPush": True}],
+        [{"name": "my-repo"}],
+        id="derive-name-ignores-query-and-fragment",
+    ),
+    pytest.param(
+        # Last path segment, matching `basename URL .git` in hydrate.sh
+        [{"url": "https://gitlab.com/group/subgroup/my-repo.git", "autoPush": True}],
+        [{"name": "my-repo"}],
+        id="derive-name-nested-group",
+    ),
+]
 
-        assert result == []
 
-    def test_parse_repo_without_url(self):
-        """Test that repos without URL are skipped."""
-        repos_json = json.dumps([
-            {
-                "branch": "main",
-                "autoPush": True
-            }
-        ])
-
-        with patch.dict(os.environ, {"REPOS_JSON": repos_json}):
-            result = self.adapter._get_repos_config()
+class TestGetReposConfig:
+    """Tests for _get_repos_config and _normalize_repos methods."""
 
-        assert result == []
+    def test_parse_repos_json_env(self, adapter, monkeypatch):
+        """Test that REPOS_JSON is read from the environment and normalized."""
+        monkeypatch.setenv("REPOS_JSON", json.dumps([
+            {"url": "https://github.com/owner/repo.git", "branch": "main", "autoPush": True}
+        ]))
+        result = adapter._get_repos_config()
 
-    def test_derive_repo_name_from_url(self):
-        """Test automatic derivation of repo name from URL."""
-        test_cases = [
-            ("https://github.com/owner/my-repo.git", "my-repo"),
-            ("https://github.com/owner/my-repo", "my-repo"),
-            ("git@github.com:owner/another-repo.git", "another-repo"),
+        assert result == [
+            {"name": "repo", "url": "https://github.com/owner/repo.git", "branch": "main", "autoPush": True}
         ]
 
-        for url, expected_name in test_cases:
-            repos_json = json.dumps([{"url": url, "autoPush": True}])
-
-            with patch.dict(os.environ, {"REPOS_JSON": repos_json}):
-                result = self.adapter._get_repos_config()
-
-            assert len(result) == 1
-            assert result[0]["name"] == expected_name
-
-    def test_autopush_with_invalid_string_type(self):
-        """Test that string autoPush values default to False."""
-        repos_json = json.dumps([
+    @pytest.mark.parametrize("repos,expected", REPO_CASES)
+    def test_normalize_repos(self, adapter, repos, expected):
+        """Test normalizing valid REPOS_JSON entries."""
+        result = adapter._normalize_repos(repos)
+
+        assert len(result) == len(expected)
+        for repo, fields in zip(result, expected):
+            assert isinstance(repo["autoPush"], bool)
+            assert {key: repo[key] for key in fields} == fields
+
+    @pytest.mark.parametrize("raw", [
+        pytest.param("", id="empty"),
+        pytest.param(None, id="missing"),
+        pytest.param("invalid-json{", id="invalid-json"),
+        pytest.param('{"url": "https://github.com/owner/repo.git"}', id="non-list"),
+        pytest.param('[{"branch": "main", "autoPush": true}]', id="repo-without-url"),
+        pytest.param("[" * 100000 + "]" * 100000, id="too-deeply-nested"),
+    ])
+    def test_parse_returns_empty(self, adapter, monkeypatch, raw):
+        """Test that missing, empty, malformed, or url-less REPOS_JSON yields no repos."""
+        if raw is None:
+            monkeypatch.delenv("REPOS_JSON", raising=False)
+        else:
+            monkeypatch.setenv("REPOS_JSON", raw)
+
+        assert adapter._get_repos_config() == []
+
+    @pytest.mark.parametrize("bad_value", ["true", 1, None, [], {}, 0, ""])
+    def test_autopush_with_invalid_type(self, adapter, bad_value):
+        """Test that non-boolean autoPush values default to False."""
+        result = adapter._normalize_repos([
             {
                 "url": "https://github.com/owner/repo.git",
-                "autoPush": "true"  # String instead of boolean
+                "autoPush": bad_value
             }
         ])
 
-        with patch.dict(os.environ, {"REPOS_JSON": repos_json}):
-            result = self.adapter._get_repos_config()
-
         assert len(result) == 1
         # Invalid type should default to False
         assert result[0]["autoPush"] is False
 
-    def test_autopush_with_invalid_number_type(self):
-        """Test that numeric autoPush values default to False."""
-        repos_json = json.dumps([
-            {
-                "url": "https://github.com/owner/repo.git",
-                "autoPush": 1  # Number instead of boolean
-            }
-        ])
-
-        with patch.dict(os.environ, {"REPOS_JSON": repos_json}):
-            result = self.adapter._get_repos_config()
-
-        assert len(result) == 1
-        # Invalid type should default to False
-        assert result[0]["autoPush"] is False
 
-    def test_autopush_with_null_value(self):
-        """Test that null autoPush values default to False."""
-        repos_json = json.dumps([
-            {
-                "url": "https://github.com/owner/repo.git",
-                "autoPush": None  # null in JSON
-            }
-        ])
-
-        with patch.dict(os.environ, {"REPOS_JSON": repos_json}):
-            result = self.adapter._get_repos_config()
-
-        assert len(result) == 1
-        # null should default to False
-        assert result[0]["autoPush"] is False
+# Shared repos_cfg inputs, built once and never mutated (the adapter only reads them)
+REPOS_AUTOPUSH = (
+    {"name": "my-repo", "url": "https://github.com/owner/my-repo.git", "branch": "main", "autoPush": True},
+)
+REPOS_NO_AUTOPUSH = (
+    {"name": "my-repo", "url": "https://github.com/owner/my-repo.git", "branch": "main", "autoPush": False},
+)
+# repo3 is in the general repos list but not in the git push instructions
+REPOS_MIXED_AUTOPUSH = (
+    {"name": "repo1", "url": "https://github.com/owner/repo1.git", "branch": "main", "autoPush": True},
+    {"name": "repo2", "url": "https://github.com/owner/repo2.git", "branch": "develop", "autoPush": True},
+    {"name": "repo3", "url": "https://github.com/owner/repo3.git", "branch": "feature", "autoPush": False},
+)
+
+GIT_INSTRUCTIONS = ("Git Push Instructions", "git add", "git commit", "git push origin")
+
+# (case id, repos_cfg, workflow_name, substrings that must appear, substrings that must not appear)
+_PROMPT_EXPECTATIONS = [
+    ("autopush-git-instructions", REPOS_AUTOPUSH, None, GIT_INSTRUCTIONS, ()),
+    (
+        "autopush-repo-listed",
+        REPOS_AUTOPUSH,
+        None,
+        ("**Repositories**: repos/my-repo/", "- **repos/my-repo/**"),
+        (),
+    ),
+    ("no-autopush-excludes-git-instructions", REPOS_NO_AUTOPUSH, None, (), GIT_INSTRUCTIONS),
+    (
+        "multiple-autopush-repos",
+        REPOS_MIXED_AUTOPUSH,
+        None,
+        ("repos/repo3/", "- **repos/repo1/**", "- **repos/repo2/**"),
+        ("- **repos/repo3/**",),
+    ),
+    ("without-repos", (), None, ("Workspace Structure", "Artifacts"), ("Git Push Instructions",)),
+    (
+        "with-workflow",
+        REPOS_AUTOPUSH,
+        "test-workflow",
+        ("workflows/test-workflow/", "Git Push Instructions", "repos/my-repo/"),
+        (),
+    ),
+]
+PROMPT_CASES = [pytest.param(*case, id=case_id) for case_id, *case in _PROMPT_EXPECTATIONS]
 
 
 class TestBuildWorkspaceContextPrompt:
     """Tests for _build_workspace_context_prompt method."""
 
-    def setup_method(self):
-        """Set up test fixtures."""
-        # Import here after mocking dependencies
-        from adapter import ClaudeCodeAdapter
-
-        self.adapter = ClaudeCodeAdapter()
-
-        # Create a mock context
-        mock_context = MagicMock()
-        mock_context.workspace_path = "/workspace"
-        self.adapter.context = mock_context
-
-    def test_prompt_includes_git_instructions_with_autopush(self):
-        """Test that git push instructions are included when autoPush=true."""
-        repos_cfg = [
-            {
-                "name": "my-repo",
-                "url": "https://github.com/owner/my-repo.git",
-                "branch": "main",
-                "autoPush": True
-            }
-        ]
-
-        prompt = self.adapter._build_workspace_context_prompt(
-            repos_cfg=repos_cfg,
-            workflow_name=None,
-            artifacts_path="artifacts",
-            ambient_config={}
-        )
-
-        # Verify git instructions are present
-        assert "Git Push Instructions" in prompt
-        assert "repos/my-repo/" in prompt
-        assert "branch: main" in prompt
-        assert "git add" in prompt
-        assert "git commit" in prompt
-        assert "git push origin" in prompt
-
-    def test_prompt_excludes_git_instructions_without_autopush(self):
-        """Test that git push instructions are excluded when autoPush=false."""
-        repos_cfg = [
-            {
-                "name": "my-repo",
-                "url": "https://github.com/owner/my-repo.git",
-                "branch": "main",
-                "autoPush": False
-            }
-        ]
-
-        prompt = self.adapter._build_workspace_context_prompt(
-            repos_cfg=repos_cfg,
-            workflow_name=None,
-            artifacts_path="artifacts",
-            ambient_config={}
-        )
-
-        # Verify git instructions are NOT present
-        assert "Git Push Instructions" not in prompt
-        assert "git add" not in prompt
-        assert "git commit" not in prompt
-        assert "git push origin" not in prompt
-
-    def test_prompt_includes_multiple_autopush_repos(self):
-        """Test that all autoPush repos are listed in instructions."""
-        repos_cfg = [
-            {
-                "name": "repo1",
-                "url": "https://github.com/owner/repo1.git",
-                "branch": "main",
-                "autoPush": True
-            },
-            {
-                "name": "repo2",
-                "url": "https://github.com/owner/repo2.git",
-                "branch": "develop",
-                "autoPush": True
-            },
-            {
-                "name": "repo3",
-                "url": "https://github.com/owner/repo3.git",
-                "branch": "feature",
-                "autoPush": False
-            }
-        ]
-
-        prompt = self.adapter._build_workspace_context_prompt(
-            repos_cfg=repos_cfg,
-            workflow_name=None,
-            artifacts_path="artifacts",
-            ambient_config={}
-        )
-
-        # Verify both autoPush repos are listed
-        assert "repos/repo1/" in prompt
-        assert "branch: main" in prompt
-        assert "repos/repo2/" in prompt
-        assert "branch: develop" in prompt
-        # repo3 should not be in git instructions since autoPush=false
-        # (but it will be in the general repos list)
-
-    def test_prompt_without_repos(self):
-        """Test prompt generation when no repos are configured."""
-        prompt = self.adapter._build_workspace_context_prompt(
-            repos_cfg=[],
-            workflow_name=None,
-            artifacts_path="artifacts",
-            ambient_config={}
-        )
-
-        # Should not include git instructions
-        assert "Git Push Instructions" not in prompt
-        # Should still include other sections
-        assert "Workspace Structure" in prompt
-        assert "Artifacts" in prompt
-
-    def test_prompt_with_workflow(self):
-        """Test prompt generation with workflow context."""
-        repos_cfg = [
-            {
-                "name": "my-repo",
-                "url": "https://github.com/owner/my-repo.git",
-                "branch": "main",
-                "autoPush": True
-            }
-        ]
-
-        prompt = self.adapter._build_workspace_context_prompt(
+    @pytest.fixture(autouse=True)
+    def _context(self, adapter):
+        """Attach a minimal context to the shared adapter for each test."""
+        adapter.context = SimpleNamespace(workspace_path="/workspace")
+        yield
+        adapter.context = None
+
+    @pytest.mark.parametrize("repos_cfg,workflow_name,required,forbidden", PROMPT_CASES)
+    def test_prompt_contents(self, adapter, repos_cfg, workflow_name, required, forbidden):
+        """Test that the prompt includes/excludes the expected sections."""
+        prompt = adapter._build_workspace_context_prompt(
             repos_cfg=repos_cfg,
-            workflow_name="test-workflow",
+            workflow_name=workflow_name,
             artifacts_path="artifacts",
             ambient_config={}
         )
 
-        # Should include both workflow info and git instructions
-        assert "workflows/test-workflow/" in prompt
-        assert "Git Push Instructions" in prompt
-        assert "repos/my-repo/" in prompt
+        for text in required:
+            assert text in prompt
+        for text in forbidden:
+            assert text not in prompt